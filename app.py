@@ -1,8 +1,12 @@
 import dash
 from dash_bootstrap_components import themes
 
+import profiling
+
 external_stylesheet = [themes.JOURNAL]
 
 app = dash.Dash(__name__, assets_ignore='.*bootstrap-litera.css.*', external_stylesheets=external_stylesheet)
 server = app.server
-app.config.suppress_callback_exceptions = True
\ No newline at end of file
+app.config.suppress_callback_exceptions = True
+
+profiling.init_app(server)
\ No newline at end of file
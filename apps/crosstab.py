@@ -0,0 +1,67 @@
+import numpy as np
+
+'''
+----------------------------
+ARRAY KERNELS FOR CROSSTABS
+----------------------------
+'''
+# These work on the raw numeric codes of the survey (e.g. 1.0, 2.0, 99.0) rather than on labelled
+# DataFrames, so a whole crosstab is a handful of numpy operations instead of a pandas groupby.
+
+
+# Maps each code in `values` to its position within `categories`, or -1 where the value is missing
+# or not one of the categories.
+# values: (n,) codes for one item, or (n, k) codes for k items
+# categories: (m,) codes shared by all items, or (k, m) codes per item, padded with NaN
+def encode(values, categories):
+    values = np.asarray(values, dtype=float)
+    categories = np.asarray(categories, dtype=float)
+
+    # (n, m) or (n, k, m): does respondent i's answer equal category c (of item j)
+    matches = values[..., None] == categories
+
+    return np.where(matches.any(axis=-1), matches.argmax(axis=-1), -1)
+
+
+# Weighted counts of every (item, x category, y category) combination in one bincount.
+# x_codes: (n,) encoded demographic; y_codes: (n, k) encoded items; weights: (n,) or None to count.
+# Returns an array of shape (k, n_x, n_y)
+def stacked_counts(x_codes, y_codes, weights, n_x, n_y):
+    y_codes = np.asarray(y_codes)
+    if y_codes.ndim == 1:
+        y_codes = y_codes[:, None]
+
+    n, k = y_codes.shape
+    x_codes = np.broadcast_to(np.asarray(x_codes)[:, None], (n, k))
+    items = np.broadcast_to(np.arange(k), (n, k))
+
+    valid = (x_codes >= 0) & (y_codes >= 0)
+    if weights is not None:
+        weights = np.broadcast_to(np.asarray(weights, dtype=float)[:, None], (n, k))
+        valid &= ~np.isnan(weights)
+        weights = weights[valid]
+
+    keys = (items[valid] * n_x + x_codes[valid]) * n_y + y_codes[valid]
+    counts = np.bincount(keys, weights=weights, minlength=k * n_x * n_y)
+
+    return counts.reshape(k, n_x, n_y)
+
+
+# Row percentages of a (..., n_x, n_y) count array; rows without any answers come out as NaN
+def row_percent(counts):
+    totals = counts.sum(axis=-1, keepdims=True)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return counts / totals * 100
+
+
+# Weighted (or, with weights=None, plain) counts of one demographic against one item, shape (n_x, n_y).
+# Rows and columns follow the order of x_categories / y_categories
+def counts_2d(x, y, weights, x_categories, y_categories):
+    x_categories = list(x_categories)
+    y_categories = list(y_categories)
+
+    counts = stacked_counts(encode(x, x_categories), encode(y, y_categories), weights,
+                            len(x_categories), len(y_categories))
+
+    return counts[0]
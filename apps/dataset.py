@@ -0,0 +1,303 @@
+import functools
+import glob
+import logging
+import os
+import re
+import threading
+import time
+
+import pyreadstat
+
+'''
+-------
+DATASET
+-------
+'''
+# Everything derived from the survey file (the cleaned data, the codebook and the dropdown
+# structures) lives on one Dataset object. The server can rebuild it in the background when
+# the file changes and then swap it in with a single assignment. Callbacks take a snapshot
+# with current() once per request, so they never mix data from two versions.
+#
+# DATASET_PATH may be a glob pattern. The matches are ordered by file name, with numbers compared as
+# numbers, and the last one is used, so a corrected release ('ATP W42 v2.sav') can be added next to
+# the old file. File times aren't used to pick a release, since copies, checkouts and chmod change
+# them. Replace files by copying them in under a temporary name and renaming, so a half-written
+# file is never read.
+# DATASET_POLL_SECONDS sets how often the file is checked (0 turns the watcher off).
+
+DATASET_PATH = os.environ.get('DATASET_PATH', 'data/ATP W42*.sav')
+POLL_SECONDS = float(os.environ.get('DATASET_POLL_SECONDS', '30'))
+
+logger = logging.getLogger(__name__)
+
+
+def latest_file(pattern=DATASET_PATH):
+    paths = glob.glob(pattern)
+    if not paths:
+        raise FileNotFoundError('no dataset matches {!r}'.format(pattern))
+
+    return max(paths, key=release_order)
+
+
+# 'ATP W42.sav' < 'ATP W42 v2.sav' < 'ATP W42 v10.sav'
+def release_order(fpath):
+    name = os.path.splitext(os.path.basename(fpath))[0]
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in re.split(r'(\d+)', name)]
+
+
+# identifies one version of a release file: which file, and when it was last written or replaced
+def file_version(fpath):
+    stat = os.stat(fpath)
+    return '{}:{}:{}'.format(os.path.basename(fpath), stat.st_ctime_ns, stat.st_size)
+
+
+class Dataset:
+    def __init__(self, fpath):
+        self.fpath = fpath
+        self.version = file_version(fpath)
+
+        # results of the @cached functions for this version of the data
+        self.cache = {}
+
+        df, meta = pyreadstat.read_sav(fpath)
+
+        df_copy = pyreadstat.pyreadstat.set_value_labels(df, meta)
+
+
+        # -----------------------------
+        # DATA CLEANING, TRANSFORMATION
+        # -----------------------------
+
+        # helper function used to sort survey items according to their thematic subject matter code (e.g. starts with 'RQ')
+        def list_helper(theme_code):
+            return [i for i in df.columns if theme_code in i]
+
+
+        society = ['PAST_W42', 'FUTURE_W42', 'SC1_W42']
+        policy = list_helper('POLICY')
+        confidence = list_helper('CONF')
+        rq_form1 = list_helper('RQ')
+        pq_form2 = list_helper('PQ')
+        scm4 = list_helper('SCM4')
+        scm5 = list_helper('SCM5')
+        q = [i for i in df.columns if re.search("^Q[0-9]", i)] #regex to grab Q6, Q7, etc.
+        pop = list_helper('POP')
+        knowledge = list_helper('KNOW')
+        demographics = list_helper('F_')
+        weight = ['WEIGHT_W42']
+
+
+
+        # The dictionary meta.column_names_to_labels repeats the key at the start of the value string.
+        # e.g. key = 'PAST_W42'; value = 'PAST_W42. Compared with twenty years ago...'
+        # This for loop removes the substring 'PAST_W42' from the beginning of the value string. 
+
+        for key, value in meta.column_names_to_labels.items():
+            meta.column_names_to_labels[key] = re.sub(pattern='.+\.\s?', string=value, repl='')
+
+
+        # within the same dictionary, the following string (saved as a regex pattern) repeats for each CONF item.
+        # this for loop removes 'pattern' in order to make for easier reading later on
+
+        pattern = '^How much confidence, if any, do you have in each of the following to act in the best interests of the public\?\s'
+
+        for key, value in meta.column_names_to_labels.items():
+            if key in confidence:
+                meta.column_names_to_labels[key] = re.sub(pattern=pattern, string=value, repl='')
+
+
+
+        # For certain columns, ordinal values didn't follow a spectrum of good to bad; agree to disagree
+        # Here we collect these columns, and use a for loop to switch 'Worse' from 2.0 to 3.0
+        # The values now read {1.0: 'Better', 3.0: 'Worse', 2.0: 'About the same', 99.0: 'Refused'}
+
+        rq_pq = rq_form1 + pq_form2
+
+        ordinals_to_switch = [i for i in rq_pq if re.search("^(P|R)Q(1)", i)]
+        ordinals_to_switch = ordinals_to_switch + society + q + ['POLICY3_W42']
+
+        for col_name in ordinals_to_switch:
+            df[col_name] = df[col_name].map(lambda x: 2.0 if x == 3.0 else (3.0 if x == 2.0 else x))
+
+
+
+        # To directly edit the dictionary values of meta.variable_values_labels, it was copied as variable 'meta_vvl' to make more readable
+        # The dict object is still stored at the same memory location as the variable, so values _2, _3 are used to switch 2.0 to 3.0 and vice versa. Otherwise the elif statement wouldn't change due key 2.0 equalling key 3.0
+
+        meta_vvl = meta.variable_value_labels.copy()
+
+        for col_name in ordinals_to_switch:
+
+            value_2 = meta_vvl[col_name][2.0]
+            value_3 = meta_vvl[col_name][3.0]
+
+            for k, v in meta_vvl[col_name].items():
+
+                if k == 2.0:
+                    meta_vvl[col_name][2.0] = value_3
+
+                elif k == 3.0:
+                    meta_vvl[col_name][3.0] = value_2
+
+        # dictionary of column names to be used with the dcc.Dropdown() property 'options'
+        demo_dropdown = [{'label': v, 'value': k} for k,v in meta.column_names_to_labels.items() if k in demographics]
+
+
+        # labels to be used with the theme selection dropdown, similar to demo. 
+        theme_categories = ['Social impact of scientific developments',
+                            'Policy decisions on scientific issues',
+                            'Confidence in public figures',
+                            'Importance of scientific issues',
+                            'Opinions on research scientists',
+                            'Questions regarding scientific research',
+                            'Solving the countries problems',
+                            'General scientific knowledge']
+
+        theme_names = [society, policy, confidence, scm4, scm5, q, pop, knowledge]
+        theme_select_dropdown = dict(zip(theme_categories, theme_names))
+
+
+        # labels to be used with the researcher selection dropdown
+        researchers_cat = ['Medical Research Scientists', 
+                           'Environmental Research Scientists', 
+                           'Nutrition Research Scientists']
+
+        med_scientists = [i for i in rq_form1 if re.search("(_F1A)", i)]
+        env_scientists = [i for i in rq_form1 if re.search("(_F1B)", i)]
+        nutr_scientists = [i for i in rq_form1 if re.search("(_F1C)", i)]
+
+        research_names = [med_scientists, env_scientists, nutr_scientists]
+        res_dropdown = dict(zip(researchers_cat, research_names))
+
+
+        # labels to be used with the practitioner selection dropdown
+        practitioners_cat = ['Medical Doctors', 
+                             'Environmental Health Specialists', 
+                             'Dietician']
+
+        md = [i for i in pq_form2 if re.search("(_F2A)", i)]
+        env_specialists = [i for i in pq_form2 if re.search("(_F2B)", i)]
+        dieticians = [i for i in pq_form2 if re.search("(_F2C)", i)]
+
+        pract_names = [md, env_specialists, dieticians]
+        pract_dropdown = dict(zip(practitioners_cat, pract_names))
+
+
+        # Items without value labels in the codebook (KNOW_INDEX_W42, a score rather than an answer)
+        # have no answer categories to chart or tabulate, so they aren't offered in any dropdown
+
+        for groups in [theme_select_dropdown, res_dropdown, pract_dropdown]:
+            for key, items in groups.items():
+                groups[key] = [i for i in items if i in meta_vvl]
+
+        self.df = df
+        self.df_copy = df_copy
+        self.meta = meta
+        self.meta_vvl = meta_vvl
+        self.demographics = demographics
+        self.demo_dropdown = demo_dropdown
+        self.theme_select_dropdown = theme_select_dropdown
+        self.res_dropdown = res_dropdown
+        self.pract_dropdown = pract_dropdown
+
+
+# Caches fn(ds, *args) on the dataset it was computed from, so a new version of the data
+# starts with empty caches and the old results go away with the old dataset.
+# Cached results are shared between callers and must not be modified
+def cached(fn):
+    @functools.wraps(fn)
+    def wrapper(ds, *args):
+        key = (fn.__name__,) + args
+        try:
+            return ds.cache[key]
+        except KeyError:
+            result = ds.cache[key] = fn(ds, *args)
+            return result
+
+    return wrapper
+
+
+'''
+----------
+HOT RELOAD
+----------
+'''
+
+_current = None
+_lock = threading.RLock()
+_warmers = []
+
+
+def current():
+    global _current
+
+    if _current is None:
+        with _lock:
+            if _current is None:
+                _current = Dataset(latest_file())
+
+    return _current
+
+
+# Registers fn(ds) to precompute views for a newly loaded dataset before it is swapped in
+def warmer(fn):
+    _warmers.append(fn)
+    return fn
+
+
+def reload(fpath=None):
+    global _current
+
+    with _lock:
+        fpath = fpath or latest_file()
+        if _current is not None and file_version(fpath) == _current.version:
+            return _current
+
+        new = Dataset(fpath)
+        for warm in _warmers:
+            # a view that can't be precomputed is computed on its first request instead
+            try:
+                warm(new)
+            except Exception:
+                logger.exception('warming %s for %s failed', warm.__name__, new.version)
+
+        old, _current = _current, new
+
+    logger.info('dataset %s replaced by %s', old.version if old else None, new.version)
+    return new
+
+
+def _watch(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            fpath = latest_file()
+            version = file_version(fpath)
+            if version == current().version:
+                continue
+
+            # give a file that is still being written a moment to settle before reading it
+            time.sleep(1)
+            if file_version(fpath) == version:
+                reload(fpath)
+        except Exception:
+            # keep serving the current version; the next poll tries again
+            logger.exception('reloading the dataset failed')
+
+
+_watcher = None
+_watcher_pid = None
+
+
+def start_watching(interval=POLL_SECONDS):
+    # One watcher thread per worker process. Threads don't survive a fork, so a process forked from
+    # one that was already watching (gunicorn --preload) starts its own
+    global _watcher, _watcher_pid
+
+    with _lock:
+        if interval <= 0 or (_watcher is not None and _watcher_pid == os.getpid()):
+            return
+
+        _watcher = threading.Thread(target=_watch, args=(interval,), name='dataset-watcher', daemon=True)
+        _watcher_pid = os.getpid()
+        _watcher.start()
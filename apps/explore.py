@@ -1,248 +1,193 @@
 import dash_html_components as html
 import dash_core_components as dcc
 import dash_bootstrap_components as dbc
+import dash_table
 from dash.dependencies import Input, Output
 
-import plotly.express as px
-import plotly.graph_objects as go
-
 import pandas as pd
 import numpy as np
 from scipy import stats
-import pyreadstat
-import re
 
 from app import app
+from apps import crosstab, dataset, figures
+from apps.singleflight import flight
 
 
 
-# load data
-fpath = 'data/ATP W42.sav'
+# rows per page of the unweighted/weighted tables
+PAGE_SIZE = 15
 
-df, meta = pyreadstat.read_sav(fpath)
+# The data is loaded and cleaned in apps/dataset.py. Every function below takes the Dataset `ds` to work
+# on as its first argument; callbacks pass dataset.current(), so a reloaded file is picked up without
+# a restart and one request never mixes two versions of the data.
 
-df_copy = pyreadstat.pyreadstat.set_value_labels(df, meta)
+'''
+---------
+FUNCTIONS
+---------
+'''
+# Rather than repeat the following code for the callbacks of tab1/tab2/tab3, they're saved as the following functions
 
+# Crosstabs are computed from the numeric codes in ds.df with apps.crosstab instead of pd.crosstab/groupby.
+# meta_vvl holds the same label dicts as meta.variable_value_labels (with the 2.0/3.0 swap applied),
+# so code k of an item always carries the label meta_vvl[item][k], and rows and columns come out in
+# the codebook order the labelled versions used to select with .loc
 
-""" 
------------------------------
-DATA CLEANING, TRANSFORMATION
------------------------------
-"""
+def xy_counts(ds, x, y, weights):
+    return crosstab.counts_2d(ds.df[x].to_numpy(), ds.df[y].to_numpy(), weights,
+                              ds.meta_vvl[x].keys(), ds.meta_vvl[y].keys())
 
-# helper function used to sort survey items according to their thematic subject matter code (e.g. starts with 'RQ')
-def list_helper(theme_code):
-    return [i for i in df.columns if theme_code in i]
 
+def labelled(ds, values, x, y):
+    return pd.DataFrame(values,
+                        index=pd.Index(ds.meta_vvl[x].values(), name=x),
+                        columns=pd.Index(ds.meta_vvl[y].values(), name=y))
 
-society = ['PAST_W42', 'FUTURE_W42', 'SC1_W42']
-policy = list_helper('POLICY')
-confidence = list_helper('CONF')
-rq_form1 = list_helper('RQ')
-pq_form2 = list_helper('PQ')
-scm4 = list_helper('SCM4')
-scm5 = list_helper('SCM5')
-q = [i for i in df.columns if re.search("^Q[0-9]", i)] #regex to grab Q6, Q7, etc.
-pop = list_helper('POP')
-knowledge = list_helper('KNOW')
-demographics = list_helper('F_')
-weight = ['WEIGHT_W42']
 
+# weighted percent distribution of y within each category of x, rounded to 2 decimals.
+# A category nobody is in gets 0s, as pd.crosstab(normalize='index') gave it
+def freq_distr(ds, x, y):
+    counts = xy_counts(ds, x, y, ds.df.WEIGHT_W42.to_numpy())
+    
+    return labelled(ds, np.round(np.nan_to_num(crosstab.row_percent(counts)), 2), x, y)
 
 
-# The dictionary meta.column_names_to_labels repeats the key at the start of the value string.
-# e.g. key = 'PAST_W42'; value = 'PAST_W42. Compared with twenty years ago...'
-# This for loop removes the substring 'PAST_W42' from the beginning of the value string. 
+@flight.coalesce
+def make_freq_distr(ds, x, y):
+    new_df = freq_distr(ds, x, y)
 
-for key, value in meta.column_names_to_labels.items():
-    meta.column_names_to_labels[key] = re.sub(pattern='.+\.\s?', string=value, repl='')
+    return figures.freq_distr_figure(new_df.to_numpy(), new_df.index, new_df.columns, x, y)
 
-    
-# within the same dictionary, the following string (saved as a regex pattern) repeats for each CONF item.
-# this for loop removes 'pattern' in order to make for easier reading later on
 
-pattern = '^How much confidence, if any, do you have in each of the following to act in the best interests of the public\?\s'
+# The counts behind the unweighted/weighted tables are cached per dataset and (x, y), so paging and sorting
+# a table only slices the already aggregated pivot instead of regrouping the whole dataset.
+# Below the cache, flight.coalesce makes concurrent misses for the same pair compute it only once.
 
-for key, value in meta.column_names_to_labels.items():
-    if key in confidence:
-        meta.column_names_to_labels[key] = re.sub(pattern=pattern, string=value, repl='')
-        
-        
-        
-# For certain columns, ordinal values didn't follow a spectrum of good to bad; agree to disagree
-# Here we collect these columns, and use a for loop to switch 'Worse' from 2.0 to 3.0
-# The values now read {1.0: 'Better', 3.0: 'Worse', 2.0: 'About the same', 99.0: 'Refused'}
+@dataset.cached
+@flight.coalesce
+def unweighted_counts(ds, x, y):
+    # respondents with a weight, like groupby().WEIGHT_W42.count()
+    # combinations nobody answered count 0, as the groupby over the categorical columns gave them
+    return labelled(ds, xy_counts(ds, x, y, ds.df.WEIGHT_W42.notna().to_numpy(dtype=float)), x, y)
 
-rq_pq = rq_form1 + pq_form2
 
-ordinals_to_switch = [i for i in rq_pq if re.search("^(P|R)Q(1)", i)]
-ordinals_to_switch = ordinals_to_switch + society + q + ['POLICY3_W42']
+@dataset.cached
+@flight.coalesce
+def weighted_counts(ds, x, y):
+    return labelled(ds, np.round(xy_counts(ds, x, y, ds.df.WEIGHT_W42.to_numpy()), 0), x, y)
 
-for col_name in ordinals_to_switch:
-    df[col_name] = df[col_name].map(lambda x: 2.0 if x == 3.0 else (3.0 if x == 2.0 else x))
-    
-    
-    
-# To directly edit the dictionary values of meta.variable_values_labels, it was copied as variable 'meta_vvl' to make more readable
-# The dict object is still stored at the same memory location as the variable, so values _2, _3 are used to switch 2.0 to 3.0 and vice versa. Otherwise the elif statement wouldn't change due key 2.0 equalling key 3.0
 
-meta_vvl = meta.variable_value_labels.copy()
+def table_page(temp_pivot, page_current, page_size, sort_by):
+    # Returns the columns, the rows of the requested page and the page count for a dash_table.DataTable
+    # with page_action/sort_action='custom'. Sorting only computes a row order; records are built
+    # for the visible rows alone
+    n_rows = len(temp_pivot.index)
+    page_count = max(1, -(-n_rows // page_size))
+    page_current = min(max(page_current or 0, 0), page_count - 1)
 
-for col_name in ordinals_to_switch:
-    
-    value_2 = meta_vvl[col_name][2.0]
-    value_3 = meta_vvl[col_name][3.0]
+    order = np.arange(n_rows)
 
-    for k, v in meta_vvl[col_name].items():
-        
-        if k == 2.0:
-            meta_vvl[col_name][2.0] = value_3
-            
-        elif k == 3.0:
-            meta_vvl[col_name][3.0] = value_2
-            
-# dictionary of column names to be used with the dcc.Dropdown() property 'options'
-demo_dropdown = [{'label': v, 'value': k} for k,v in meta.column_names_to_labels.items() if k in demographics]
+    # the table keeps its sort_by when another demographic or item is picked, so the column may
+    # not exist anymore; rows are then shown in codebook order
+    if sort_by and sort_by[0]['column_id'] not in ['Index'] + list(temp_pivot.columns):
+        sort_by = None
 
+    if sort_by:
+        col = sort_by[0]['column_id']
+        keys = np.arange(n_rows, dtype=float) if col == 'Index' else temp_pivot[col].to_numpy(dtype=float)
 
-# labels to be used with the theme selection dropdown, similar to demo. 
-theme_categories = ['Social impact of scientific developments',
-                    'Policy decisions on scientific issues',
-                    'Confidence in public figures',
-                    'Importance of scientific issues',
-                    'Opinions on research scientists',
-                    'Questions regarding scientific research',
-                    'Solving the countries problems',
-                    'General scientific knowledge']
+        if sort_by[0]['direction'] == 'desc':
+            keys = -keys
 
-theme_names = [society, policy, confidence, scm4, scm5, q, pop, knowledge]
-theme_select_dropdown = dict(zip(theme_categories, theme_names))
+        # stable sort, so ties keep the codebook order; missing counts (NaN) go last either way
+        order = np.argsort(keys, kind='mergesort')
 
+    visible = order[page_current * page_size:(page_current + 1) * page_size]
+    
+    columns = [{'name': 'Index', 'id': 'Index'}] + [{'name': c, 'id': c} for c in temp_pivot.columns]
+    
+    values = temp_pivot.to_numpy()[visible]
+    data = []
+    for label, row in zip(temp_pivot.index[visible], values):
+        record = {'Index': label}
+        record.update({c: (None if pd.isna(v) else v) for c, v in zip(temp_pivot.columns, row)})
+        data.append(record)
 
-# labels to be used with the researcher selection dropdown
-researchers_cat = ['Medical Research Scientists', 
-                   'Environmental Research Scientists', 
-                   'Nutrition Research Scientists']
+    return columns, data, page_count
 
-med_scientists = [i for i in rq_form1 if re.search("(_F1A)", i)]
-env_scientists = [i for i in rq_form1 if re.search("(_F1B)", i)]
-nutr_scientists = [i for i in rq_form1 if re.search("(_F1C)", i)]
 
-research_names = [med_scientists, env_scientists, nutr_scientists]
-res_dropdown = dict(zip(researchers_cat, research_names))
+def unweighted_table(ds, x, y, page_current=0, page_size=PAGE_SIZE, sort_by=None):
+    return table_page(unweighted_counts(ds, x, y), page_current, page_size, sort_by)
+    
+    
 
+def weighted_table(ds, x, y, page_current=0, page_size=PAGE_SIZE, sort_by=None):
+    return table_page(weighted_counts(ds, x, y), page_current, page_size, sort_by)
 
-# labels to be used with the practitioner selection dropdown
-practitioners_cat = ['Medical Doctors', 
-                     'Environmental Health Specialists', 
-                     'Dietician']
 
-md = [i for i in pq_form2 if re.search("(_F2A)", i)]
-env_specialists = [i for i in pq_form2 if re.search("(_F2B)", i)]
-dieticians = [i for i in pq_form2 if re.search("(_F2C)", i)]
+# Compares every item of a theme for one demographic. Rather than one crosstab per item, all items are
+# encoded against their own codebooks and counted together in a single bincount over the respondents
 
-pract_names = [md, env_specialists, dieticians]
-pract_dropdown = dict(zip(practitioners_cat, pract_names))
+@flight.coalesce
+def make_theme_distr(ds, x, theme):
+    items = ds.theme_select_dropdown[theme]
+    x_labels = ds.meta_vvl[x]
+    y_labels = [ds.meta_vvl[i] for i in items]
+    n_y = max(len(i) for i in y_labels)
 
-'''
----------
-FUNCTIONS
----------
-'''
-# Rather than repeat the following code for the callbacks of tab1/tab2/tab3, they're saved as the following functions
+    # per item codebooks, padded with NaN to the longest one so they stack into one (items, categories) array
+    y_cats = np.full((len(items), n_y), np.nan)
+    for j, labels in enumerate(y_labels):
+        y_cats[j, :len(labels)] = list(labels.keys())
 
-def make_freq_distr(x,y):
-    new_df = pd.crosstab(df_copy[x],
-                     df_copy[y],
-                     df_copy.WEIGHT_W42, aggfunc = sum, dropna=True,
-                     normalize='index'). \
-                     loc[meta.variable_value_labels[x].values()]. \
-                     loc[:, meta.variable_value_labels[y].values()]*100
-    
-    new_df = new_df.applymap(lambda x: round(x, 2))
-
-    fig = px.bar(data_frame=new_df,
-                 x=new_df.columns,
-                 y=new_df.index,
-                 color_discrete_sequence=['#636efa', '#00cc96', '#ef553b', '#ab63fa'])
-#                  hover_name=new_df.index,
-#                  hover_data=(new_df.columns)*100),
-
-    fig.update_layout(
-        font={'size':15},
-        margin=dict(l=20, r=20, t=20, b=20),
-        xaxis_title="%",
-        yaxis_title=None,
-
-        legend=dict(
-            font=dict(size=16),
-            title=None,
-            yanchor="top",
-            y=1.5,
-            xanchor="left",
-            x=0.01)
-    )
-    
-    return fig
+    x_codes = crosstab.encode(ds.df[x].to_numpy(), list(x_labels.keys()))
+    y_codes = crosstab.encode(ds.df[items].to_numpy(), y_cats)
 
+    counts = crosstab.stacked_counts(x_codes, y_codes, ds.df.WEIGHT_W42.to_numpy(), len(x_labels), n_y)
+    percents = np.round(crosstab.row_percent(counts), 2)
 
-def unweighted_table(x,y):
-    temp_groupby = df_copy.groupby([x, y]).WEIGHT_W42.count().reset_index()
-    
-    temp_pivot = temp_groupby.pivot(index=x, columns=y, values='WEIGHT_W42')\
-                    .loc[meta.variable_value_labels[x].values()]\
-                    .loc[:, meta.variable_value_labels[y].values()]
-    
-    temp_values = np.rot90(temp_pivot.values, k=3)
-    temp_values = np.fliplr(temp_values)
-    temp_values = np.vstack([temp_pivot.index, temp_values])
+    return figures.theme_distr_figure(percents,
+                                      x_labels.values(),
+                                      [list(labels.values()) for labels in y_labels],
+                                      [ds.meta.column_names_to_labels[i] for i in items])
 
-    fig = go.Figure(data=[go.Table(
-        header=dict(values=['Index'] + list(temp_pivot.columns)),
-        cells=dict(values=temp_values))
-                         ])
 
-    return fig
-    
-    
+@flight.coalesce
+def chi_squared(ds, x, y):
+    df = ds.df
 
-def weighted_table(x,y):
-    temp_groupby = df_copy.groupby([x, y]).WEIGHT_W42.sum().reset_index()
-    
-    temp_groupby.WEIGHT_W42 = temp_groupby.WEIGHT_W42.map(lambda x: round(x, 0))
+    # every code that occurs in the data except 99.0 (refused), sorted like the crosstab index
+    x_codes = np.unique(df[x].dropna().to_numpy())
+    y_codes = np.unique(df[y].dropna().to_numpy())
     
-    temp_pivot = temp_groupby.pivot(index=x, columns=y, values='WEIGHT_W42')\
-                    .loc[meta.variable_value_labels[x].values()]\
-                    .loc[:, meta.variable_value_labels[y].values()]
+    observed_freq = crosstab.counts_2d(df[x].to_numpy(), df[y].to_numpy(), df.WEIGHT_W42.to_numpy(),
+                                       x_codes[x_codes != 99.0], y_codes[y_codes != 99.0])
     
-    temp_values = np.rot90(temp_pivot.values, k=3)
-    temp_values = np.fliplr(temp_values)
-    temp_values = np.vstack([temp_pivot.index, temp_values])
-
-    fig = go.Figure(data=[go.Table(
-        header=dict(values=['Index'] + list(temp_pivot.columns)),
-        cells=dict(values=temp_values))
-                         ])
-
-    return fig
-
-def chi_squared(x,y):
-    stats_df = pd.crosstab(index=df[x],
-                       columns=df[y],
-                       values=df.WEIGHT_W42,
-                       aggfunc='sum',
-                       dropna=True)
-    
-    stats_df = stats_df.drop(99.0, axis=0)
-    stats_df = stats_df.drop(99.0, axis=1)
-    
-    observed_freq = stats_df.to_numpy()
+    # codes that only occur next to a missing answer to the other item aren't part of the table
+    observed_freq = observed_freq[observed_freq.sum(axis=1) > 0][:, observed_freq.sum(axis=0) > 0]
     
     chi2, p, dof, expected = stats.chi2_contingency(observed_freq)
     
     return 'chi-squared: {} || p-value: {} || degrees of freedom: {}'.format(chi2, p, dof)
 
 
+# Tables of the default demographic are computed while a new version of the data is loaded,
+# before it is swapped in
+@dataset.warmer
+def warm_tables(ds):
+    for items in ds.theme_select_dropdown.values():
+        for y in items:
+            unweighted_counts(ds, 'F_AGECAT', y)
+            weighted_counts(ds, 'F_AGECAT', y)
+
+
+# Load the data when the app starts. New releases are picked up in the background by a watcher
+# thread, started by each worker process on its first request, so that it runs after gunicorn
+# --preload forks the workers rather than in the master, and not in tools that import this module
+dataset.reload()
+app.server.before_first_request(dataset.start_watching)
+
+
 
 '''
 ------
@@ -280,7 +225,8 @@ layout = dbc.Container([
             [
                 dbc.Tab(label='Main', tab_id='tab-1'),
                 dbc.Tab(label='Researchers', tab_id='tab-2'),
-                dbc.Tab(label='Practitioners', tab_id='tab-3')
+                dbc.Tab(label='Practitioners', tab_id='tab-3'),
+                dbc.Tab(label='Theme comparison', tab_id='tab-4')
             ],
             id="tabs",
             active_tab="tab-1",
@@ -313,71 +259,89 @@ TAB 1
 -----
 """
 
-tab1_content = html.Div([
+# Both tables are paged and sorted on the server; only the rows of the current page are sent,
+# and virtualization keeps the browser from rendering rows that are scrolled out of view
+table_props = dict(
+    page_action='custom',
+    page_current=0,
+    page_size=PAGE_SIZE,
+    sort_action='custom',
+    sort_mode='single',
+    sort_by=[],
+    virtualization=True,
+    fixed_rows={'headers': True},
+    style_table={'maxHeight': '450px', 'overflowY': 'auto'},
+    style_cell={'font-family': 'sans-serif', 'minWidth': '100px', 'textAlign': 'left'}
+)
+
+
+def tab1_content(ds):
+    return html.Div([
     
-    html.Br(),
+        html.Br(),
     
-    html.Div([
-        dbc.Row([
-            dbc.Col([
-                html.H6(children=['Demographic'], style={'font-family':'sans-serif'}),
-                dcc.Dropdown(
-                    id = 'xaxis-column1',
-                    options = demo_dropdown,
-                    value = 'F_AGECAT'
+        html.Div([
+            dbc.Row([
+                dbc.Col([
+                    html.H6(children=['Demographic'], style={'font-family':'sans-serif'}),
+                    dcc.Dropdown(
+                        id = 'xaxis-column1',
+                        options = ds.demo_dropdown,
+                        value = 'F_AGECAT'
+                    )
+                ],
+                    lg=8
                 )
-            ],
-                lg=8
-            )
-        ]),
+            ]),
         
-        html.Br(),
+            html.Br(),
 
-        dbc.Row([
-            dbc.Col([
-                html.H6(children=['Theme'], style={'font-family':'sans-serif'}),
-                dcc.Dropdown(
-                    id = 'theme-selection',
-                    options = [{'label': k, 'value': k} for k in theme_select_dropdown.keys()],
-                    value = 'Social impact of scientific developments'
-                )
-            ],
-                lg=8)
-        ]),
-        html.Br(),
+            dbc.Row([
+                dbc.Col([
+                    html.H6(children=['Theme'], style={'font-family':'sans-serif'}),
+                    dcc.Dropdown(
+                        id = 'theme-selection',
+                        options = [{'label': k, 'value': k} for k in ds.theme_select_dropdown.keys()],
+                        value = 'Social impact of scientific developments'
+                    )
+                ],
+                    lg=8)
+            ]),
+            html.Br(),
 
-        dbc.Row([
-             dbc.Col([
-                dcc.RadioItems(id='yaxis-column1',
-                              value = 'PAST_W42',
-                              inputStyle={'display-internal':'table-row'})
+            dbc.Row([
+                 dbc.Col([
+                    dcc.RadioItems(id='yaxis-column1',
+                                  value = 'PAST_W42',
+                                  inputStyle={'display-internal':'table-row'})
+                ]),
             ]),
-        ]),
 
-        dbc.Row([
-            html.Br(),
-            html.Br(),
-            html.Br(),
+            dbc.Row([
+                html.Br(),
+                html.Br(),
+                html.Br(),
 
-            dbc.Col([
-                dcc.Graph(id='indicator-bar1',
-                          config={'displayModeBar': False}
-                )
-            ])
-        ]),
+                dbc.Col([
+                    dcc.Graph(id='indicator-bar1',
+                              config={'displayModeBar': False}
+                    )
+                ])
+            ]),
 
-        html.Br(),
-        dbc.Row([
-            html.P(id='chi-squared1')
-        ]),
+            html.Br(),
+            dbc.Row([
+                html.P(id='chi-squared1')
+            ]),
 
-        html.H5('unweighted data'),
-        dcc.Graph(id='unweighted-table1'),
+            html.H5('unweighted data'),
+            dash_table.DataTable(id='unweighted-table1', **table_props),
 
-        html.H5('weighted data'),
-        dcc.Graph(id='weighted-table1')
+            html.Br(),
+            html.H5('weighted data'),
+            dash_table.DataTable(id='weighted-table1', **table_props)
+        ])
     ])
-])
 
 
 """ 
@@ -386,59 +350,60 @@ TAB 2
 -----
 """
 
-tab2_content = html.Div([
+def tab2_content(ds):
+    return html.Div([
     
-    html.Br(),
+        html.Br(),
     
-    html.Div([
-        dbc.Row([
-            dbc.Col([
-                html.H6(children=['Please choose a demographic'], style={'font-family':'sans-serif'}),
-                dcc.Dropdown(
-                    id = 'xaxis-column2',
-                    options = demo_dropdown,
-                    value = 'F_AGECAT'
+        html.Div([
+            dbc.Row([
+                dbc.Col([
+                    html.H6(children=['Please choose a demographic'], style={'font-family':'sans-serif'}),
+                    dcc.Dropdown(
+                        id = 'xaxis-column2',
+                        options = ds.demo_dropdown,
+                        value = 'F_AGECAT'
+                    )
+                ],
+                    lg=8
                 )
-            ],
-                lg=8
-            )
-        ]),
-        html.Br(),
+            ]),
+            html.Br(),
 
-        dbc.Row([
-            dbc.Col([
-                html.H6(children=['Researcher'], style={'font-family':'sans-serif'}),
-                dcc.Dropdown(
-                    id = 'researcher-selection',
-                    options = [{'label': k, 'value': k} for k in res_dropdown.keys()],
-                    value = 'Medical Research Scientists'
-                )
-            ],
-                lg=8)
-        ]),
-        html.Br(),
+            dbc.Row([
+                dbc.Col([
+                    html.H6(children=['Researcher'], style={'font-family':'sans-serif'}),
+                    dcc.Dropdown(
+                        id = 'researcher-selection',
+                        options = [{'label': k, 'value': k} for k in ds.res_dropdown.keys()],
+                        value = 'Medical Research Scientists'
+                    )
+                ],
+                    lg=8)
+            ]),
+            html.Br(),
 
-        dbc.Row([
-             dbc.Col([
-                dcc.RadioItems(id='yaxis-column2',
-                              value = 'RQ1_F1A_W42',
-                              inputStyle={'display-inside':'flow'})
+            dbc.Row([
+                 dbc.Col([
+                    dcc.RadioItems(id='yaxis-column2',
+                                  value = 'RQ1_F1A_W42',
+                                  inputStyle={'display-inside':'flow'})
+                ]),
             ]),
-        ]),
 
-        dbc.Row([
-            html.Br(),
-            html.Br(),
-            html.Br(),
+            dbc.Row([
+                html.Br(),
+                html.Br(),
+                html.Br(),
 
-            dbc.Col([
-                dcc.Graph(id='indicator-bar2',
-                          config={'displayModeBar': False}
-                )
+                dbc.Col([
+                    dcc.Graph(id='indicator-bar2',
+                              config={'displayModeBar': False}
+                    )
+                ])
             ])
         ])
     ])
-])
 
 
 """ 
@@ -447,59 +412,110 @@ TAB 3
 -----
 """
 
-tab3_content = html.Div([
+def tab3_content(ds):
+    return html.Div([
     
-    html.Br(),
+        html.Br(),
     
-    html.Div([
-        dbc.Row([
-            dbc.Col([
-                html.H6(children=['Please choose a demographic'], style={'font-family':'sans-serif'}),
-                dcc.Dropdown(
-                    id = 'xaxis-column3',
-                    options = demo_dropdown,
-                    value = 'F_AGECAT'
+        html.Div([
+            dbc.Row([
+                dbc.Col([
+                    html.H6(children=['Please choose a demographic'], style={'font-family':'sans-serif'}),
+                    dcc.Dropdown(
+                        id = 'xaxis-column3',
+                        options = ds.demo_dropdown,
+                        value = 'F_AGECAT'
+                    )
+                ],
+                    lg=8
                 )
-            ],
-                lg=8
-            )
-        ]),
-        html.Br(),
+            ]),
+            html.Br(),
 
-        dbc.Row([
-            dbc.Col([
-                html.H6(children=['Practitioner'], style={'font-family':'sans-serif'}),
-                dcc.Dropdown(
-                    id = 'practitioner-selection',
-                    options = [{'label': k, 'value': k} for k in pract_dropdown.keys()],
-                    value = 'Medical Doctors'
-                )
-            ],
-                lg=8)
-        ]),
-        html.Br(),
+            dbc.Row([
+                dbc.Col([
+                    html.H6(children=['Practitioner'], style={'font-family':'sans-serif'}),
+                    dcc.Dropdown(
+                        id = 'practitioner-selection',
+                        options = [{'label': k, 'value': k} for k in ds.pract_dropdown.keys()],
+                        value = 'Medical Doctors'
+                    )
+                ],
+                    lg=8)
+            ]),
+            html.Br(),
 
-        dbc.Row([
-             dbc.Col([
-                dcc.RadioItems(id='yaxis-column3',
-                              value = 'PQ1_F2A_W42',
-                              inputStyle={'display-inside':'flow'})
+            dbc.Row([
+                 dbc.Col([
+                    dcc.RadioItems(id='yaxis-column3',
+                                  value = 'PQ1_F2A_W42',
+                                  inputStyle={'display-inside':'flow'})
+                ]),
             ]),
-        ]),
 
-        dbc.Row([
-            html.Br(),
+            dbc.Row([
+                html.Br(),
+                html.Br(),
+                html.Br(),
+
+                dbc.Col([
+                    dcc.Graph(id='indicator-bar3',
+                              config={'displayModeBar': False}
+                    )
+                ])
+            ])
+        ])
+    ])
+
+
+""" 
+-----
+TAB 4
+-----
+"""
+
+def tab4_content(ds):
+    return html.Div([
+    
+        html.Br(),
+    
+        html.Div([
+            dbc.Row([
+                dbc.Col([
+                    html.H6(children=['Please choose a demographic'], style={'font-family':'sans-serif'}),
+                    dcc.Dropdown(
+                        id = 'xaxis-column4',
+                        options = ds.demo_dropdown,
+                        value = 'F_AGECAT'
+                    )
+                ],
+                    lg=8
+                )
+            ]),
             html.Br(),
+
+            dbc.Row([
+                dbc.Col([
+                    html.H6(children=['Theme'], style={'font-family':'sans-serif'}),
+                    dcc.Dropdown(
+                        id = 'theme-selection4',
+                        options = [{'label': k, 'value': k} for k in ds.theme_select_dropdown.keys()],
+                        value = 'Opinions on research scientists'
+                    )
+                ],
+                    lg=8)
+            ]),
             html.Br(),
 
-            dbc.Col([
-                dcc.Graph(id='indicator-bar3',
-                          config={'displayModeBar': False}
-                )
+            dbc.Row([
+                dbc.Col([
+                    dcc.Graph(id='theme-bar4',
+                              config={'displayModeBar': False}
+                    )
+                ])
             ])
         ])
     ])
-])
 
 
 """ 
@@ -514,12 +530,16 @@ LAYOUT CALLBACKS
     [Input('tabs', 'active_tab')]
 )
 def switch_tab(at):
+    ds = dataset.current()
+
     if at == 'tab-1':
-        return tab1_content
+        return tab1_content(ds)
     elif at == 'tab-2':
-        return tab2_content
+        return tab2_content(ds)
     elif at == 'tab-3':
-        return tab3_content
+        return tab3_content(ds)
+    elif at == 'tab-4':
+        return tab4_content(ds)
     return html.P("This shouldn't ever be displayed...")
 
 """ 
@@ -532,8 +552,9 @@ TAB 1 CALLBACKS
     [Input('theme-selection', 'value')]
 )
 def set_theme_options(selected_theme):
-        temp = [i for i in theme_select_dropdown[selected_theme]]
-        temp_list = [{'label': meta.column_names_to_labels[i], 'value': i} for i in temp]
+        ds = dataset.current()
+        temp = [i for i in ds.theme_select_dropdown[selected_theme]]
+        temp_list = [{'label': ds.meta.column_names_to_labels[i], 'value': i} for i in temp]
         
         return temp_list
 
@@ -544,24 +565,34 @@ def set_theme_options(selected_theme):
      Input('yaxis-column1', 'value')]
 )
 def update_graph(x_axis, y_axis):
-    return make_freq_distr(x_axis, y_axis)
+    return make_freq_distr(dataset.current(), x_axis, y_axis)
 
 @app.callback(
-    Output('unweighted-table1', 'figure'),
+    [Output('unweighted-table1', 'columns'),
+     Output('unweighted-table1', 'data'),
+     Output('unweighted-table1', 'page_count')],
     [Input('xaxis-column1', 'value'),
-     Input('yaxis-column1', 'value')]
+     Input('yaxis-column1', 'value'),
+     Input('unweighted-table1', 'page_current'),
+     Input('unweighted-table1', 'page_size'),
+     Input('unweighted-table1', 'sort_by')]
 )
-def update_uw_table(x, y):
-    return unweighted_table(x, y)
+def update_uw_table(x, y, page_current, page_size, sort_by):
+    return unweighted_table(dataset.current(), x, y, page_current, page_size, sort_by)
 
 
 @app.callback(
-    Output('weighted-table1', 'figure'),
+    [Output('weighted-table1', 'columns'),
+     Output('weighted-table1', 'data'),
+     Output('weighted-table1', 'page_count')],
     [Input('xaxis-column1', 'value'),
-     Input('yaxis-column1', 'value')]
+     Input('yaxis-column1', 'value'),
+     Input('weighted-table1', 'page_current'),
+     Input('weighted-table1', 'page_size'),
+     Input('weighted-table1', 'sort_by')]
 )
-def update_uw_table(x, y):
-    return weighted_table(x, y)
+def update_w_table(x, y, page_current, page_size, sort_by):
+    return weighted_table(dataset.current(), x, y, page_current, page_size, sort_by)
 
 
 @app.callback(
@@ -570,7 +601,7 @@ def update_uw_table(x, y):
      Input('yaxis-column1', 'value')]
 )
 def update_chi_squared(x, y):
-    return chi_squared(x, y)
+    return chi_squared(dataset.current(), x, y)
     
 """ 
 ---------------
@@ -582,8 +613,9 @@ TAB 2 CALLBACKS
     [Input('researcher-selection', 'value')]
 )
 def set_theme_options(selected_theme):
-        temp = [i for i in res_dropdown[selected_theme]]
-        temp_list = [{'label': meta.column_names_to_labels[i], 'value': i} for i in temp]
+        ds = dataset.current()
+        temp = [i for i in ds.res_dropdown[selected_theme]]
+        temp_list = [{'label': ds.meta.column_names_to_labels[i], 'value': i} for i in temp]
         
         return temp_list
 
@@ -594,7 +626,7 @@ def set_theme_options(selected_theme):
      Input('yaxis-column2', 'value')]
 )
 def update_graph(x_axis, y_axis):
-    return make_freq_distr(x_axis, y_axis)
+    return make_freq_distr(dataset.current(), x_axis, y_axis)
 
 """ 
 ---------------
@@ -606,8 +638,9 @@ TAB 3 CALLBACKS
     [Input('practitioner-selection', 'value')]
 )
 def set_theme_options(selected_theme):
-        temp = [i for i in pract_dropdown[selected_theme]]
-        temp_list = [{'label': meta.column_names_to_labels[i], 'value': i} for i in temp]
+        ds = dataset.current()
+        temp = [i for i in ds.pract_dropdown[selected_theme]]
+        temp_list = [{'label': ds.meta.column_names_to_labels[i], 'value': i} for i in temp]
         
         return temp_list
 
@@ -618,4 +651,17 @@ def set_theme_options(selected_theme):
      Input('yaxis-column3', 'value')]
 )
 def update_graph(x_axis, y_axis):
-    return make_freq_distr(x_axis, y_axis)
+    return make_freq_distr(dataset.current(), x_axis, y_axis)
+
+""" 
+---------------
+TAB 4 CALLBACKS
+---------------
+"""
+@app.callback(
+    Output('theme-bar4', 'figure'),
+    [Input('xaxis-column4', 'value'),
+     Input('theme-selection4', 'value')]
+)
+def update_theme_graph(x_axis, theme):
+    return make_theme_distr(dataset.current(), x_axis, theme)
\ No newline at end of file
@@ -0,0 +1,162 @@
+import plotly.graph_objects as go
+import plotly.io as pio
+
+'''
+------------------------
+FIGURES AS PLAIN DICTS
+------------------------
+'''
+# px.bar and go.Figure validate every property of every trace each time a figure is built, which took
+# most of the time of a chart callback. The charts on the dashboard always have the same shape, so their
+# layout is validated once here (through go.Layout) and each figure is put together as the plain
+# {'data': [...], 'layout': {...}} dict that dcc.Graph accepts. The output is the same JSON the
+# plotly.express / make_subplots versions produced.
+
+BAR_COLORS = ['#636efa', '#00cc96', '#ef553b', '#ab63fa']
+
+# colors of the answer labels in the theme comparison, handed out by label_colors
+THEME_COLORS = BAR_COLORS + ['#FFA15A', '#19d3f3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+
+# the default template px.bar / go.Figure embed in every figure
+TEMPLATE = pio.templates[pio.templates.default].to_plotly_json()
+
+
+# layout of make_freq_distr: px.bar's defaults for a horizontal, wide-form bar chart, with the
+# overrides of its update_layout call applied
+FREQ_DISTR_LAYOUT = go.Layout(
+    template=TEMPLATE,
+    barmode='relative',
+    font={'size':15},
+    margin=dict(l=20, r=20, t=20, b=20),
+    xaxis=dict(anchor='y', domain=[0.0, 1.0], title={'text': '%'}),
+    yaxis=dict(anchor='x', domain=[0.0, 1.0], title={}),
+
+    legend=dict(
+        font=dict(size=16),
+        title={},
+        tracegroupgap=0,
+        yanchor="top",
+        y=1.5,
+        xanchor="left",
+        x=0.01)
+).to_plotly_json()
+
+
+THEME_DISTR_LAYOUT = go.Layout(
+    template=TEMPLATE,
+    barmode='relative',
+    font={'size':15},
+    margin=dict(l=20, r=20, t=60, b=20),
+
+    legend=dict(
+        font=dict(size=16),
+        title={},
+        orientation='h',
+        yanchor="bottom",
+        y=1.0,
+        xanchor="left",
+        x=0.01)
+).to_plotly_json()
+
+
+# Stacked horizontal bar of the percent distribution of an item (columns) within each category of a
+# demographic (rows). percents is an (n_x, n_y) array, x_name / y_name the column names of the two
+# variables, which px.bar used in the hover text
+def freq_distr_figure(percents, x_labels, y_labels, x_name, y_name):
+    x_labels = list(x_labels)
+    data = []
+
+    for k, label in enumerate(y_labels):
+        data.append({
+            'type': 'bar',
+            'orientation': 'h',
+            'name': label,
+            'legendgroup': label,
+            'offsetgroup': label,
+            'alignmentgroup': 'True',
+            'showlegend': True,
+            'textposition': 'auto',
+            'marker': {'color': BAR_COLORS[k % len(BAR_COLORS)]},
+            'hovertemplate': '{}={}<br>value=%{{x}}<br>{}=%{{y}}<extra></extra>'.format(y_name, label, x_name),
+            'x': percents[:, k].tolist(),
+            'y': x_labels,
+            'xaxis': 'x',
+            'yaxis': 'y'
+        })
+
+    return {'data': data, 'layout': FREQ_DISTR_LAYOUT}
+
+
+# Color of each answer label across a theme, in the order the labels first appear. Keyed on the
+# label rather than its position in the codebook, since the same answer (e.g. 'Refused', 'Not sure')
+# sits at different positions in different items and has a single legend entry
+def label_colors(items_labels):
+    colors = {}
+    for labels in items_labels:
+        for label in labels:
+            if label not in colors:
+                colors[label] = THEME_COLORS[len(colors) % len(THEME_COLORS)]
+
+    return colors
+
+
+# One stacked bar chart per item of a theme, stacked vertically with a shared x axis, as
+# make_subplots(rows=len(items), cols=1, shared_xaxes=True) laid them out.
+# percents is an (items, n_x, n_y) array; items_labels holds each item's answer labels
+def theme_distr_figure(percents, x_labels, items_labels, titles):
+    x_labels = list(x_labels)
+    n = len(items_labels)
+    spacing = 0.3 / n
+    height = (1 - spacing * (n - 1)) / n
+
+    data = []
+    layout = dict(THEME_DISTR_LAYOUT)
+    layout['height'] = 150 + n * (40 + 25 * len(x_labels))
+    layout['annotations'] = []
+
+    colors = label_colors(items_labels)
+
+    shown = set()
+    for j, labels in enumerate(items_labels):
+        axis = '' if j == 0 else str(j + 1)
+
+        for k, label in enumerate(labels):
+            data.append({
+                'type': 'bar',
+                'orientation': 'h',
+                'name': label,
+                'legendgroup': label,
+                'showlegend': label not in shown,
+                'marker': {'color': colors[label]},
+                'x': percents[j, :, k].tolist(),
+                'y': x_labels,
+                'xaxis': 'x' + axis,
+                'yaxis': 'y' + axis
+            })
+            shown.add(label)
+
+        # rows are numbered from the top, domains from the bottom of the figure
+        bottom = (n - 1 - j) * (height + spacing)
+
+        xaxis = {'anchor': 'y' + axis, 'domain': [0.0, 1.0]}
+        if j < n - 1:
+            xaxis.update(matches='x' + str(n), showticklabels=False)
+        else:
+            xaxis['title'] = {'text': '%'}
+
+        layout['xaxis' + axis] = xaxis
+        layout['yaxis' + axis] = {'anchor': 'x' + axis, 'domain': [bottom, bottom + height]}
+
+        layout['annotations'].append({
+            'font': {'size': 14},
+            'showarrow': False,
+            'text': titles[j],
+            'x': 0.5,
+            'xanchor': 'center',
+            'xref': 'paper',
+            'y': bottom + height,
+            'yanchor': 'bottom',
+            'yref': 'paper'
+        })
+
+    return {'data': data, 'layout': layout}
@@ -0,0 +1,100 @@
+import copy
+import functools
+import threading
+
+'''
+---------------------
+REQUEST COALESCING
+---------------------
+'''
+# When a link to a chart is shared, many requests for the same (demographic, item) arrive at once.
+# Wrapping a function with `flight.coalesce` makes concurrent calls with the same arguments wait on
+# the one call already running and share its result (or its exception) instead of each computing it.
+# This only spans the threads of one worker process; calls that don't overlap in time aren't affected.
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Raising the one exception object in several threads would append each waiter's frames to its shared
+# __traceback__, so every caller raises a copy starting from the traceback of the call that failed
+def _own_copy(error):
+    try:
+        own = copy.copy(error)
+    except Exception:
+        own = None
+    if type(own) is not type(error):
+        return error.with_traceback(None)
+
+    own.__cause__, own.__context__ = error.__cause__, error.__context__
+    own.__suppress_context__ = error.__suppress_context__
+    return own.with_traceback(error.__traceback__)
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        # per function name: calls made, calls that computed, calls that waited on another one
+        self.stats = {}
+
+    def do(self, key, fn, *args):
+        name = key[0]
+
+        with self.lock:
+            stats = self.stats.setdefault(name, {'calls': 0, 'executed': 0, 'coalesced': 0})
+            stats['calls'] += 1
+
+            call = self.in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self.in_flight[key] = _Call()
+                stats['executed'] += 1
+            else:
+                stats['coalesced'] += 1
+
+        if leader:
+            try:
+                call.result = fn(*args)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.in_flight[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise _own_copy(call.error)
+        return call.result
+
+    # Decorator for fn(*args) with hashable arguments. The result is shared between the callers that
+    # waited on the same call and must not be modified
+    def coalesce(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            return self.do((fn.__name__,) + args, fn, *args)
+
+        return wrapper
+
+    def metrics(self):
+        with self.lock:
+            functions = {name: dict(stats) for name, stats in self.stats.items()}
+            in_flight = len(self.in_flight)
+
+        return {
+            'functions': functions,
+            'in_flight': in_flight,
+            'calls': sum(s['calls'] for s in functions.values()),
+            'executed': sum(s['executed'] for s in functions.values()),
+            'coalesced': sum(s['coalesced'] for s in functions.values())
+        }
+
+
+# shared by the callbacks in apps/explore.py
+flight = SingleFlight()
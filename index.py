@@ -2,11 +2,13 @@ import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 import dash_html_components as html
 from dash.dependencies import Input, Output
+from flask import jsonify
 
 from app import app
 from app import server
 
 from apps import home, explore, data
+from apps.singleflight import flight
 
 navbar = dbc.NavbarSimple(
     children=[
@@ -33,13 +35,19 @@ app.layout = dbc.Container([
               [Input('url', 'pathname')])
 def navigation(pathname):
     if pathname == '/home':
-        return home.layout
+        return home.serve_layout()
     elif pathname == '/explore':
         return explore.layout
     elif pathname == '/data':
         return data.layout
     else:
-        return home.layout
+        return home.serve_layout()
+
+
+# how many duplicate computations request coalescing saved, for this worker process
+@server.route('/_metrics/single-flight')
+def single_flight_metrics():
+    return jsonify(flight.metrics())
     
     
 if __name__ == '__main__':
@@ -0,0 +1,144 @@
+"""
+Opt-in profiling of individual callback requests.
+
+Off unless the server is started with PROFILE_CALLBACKS=1. Even then only
+requests to /_dash-update-component that carry the header
+`X-Profile-Callback: 1` are profiled. For each one a cProfile dump (.prof,
+readable with pstats or snakeviz) and a short text summary (.txt) are written
+to PROFILE_DIR. The file name holds the callback's output id and input values.
+The summary splits the request's time between pandas, plotly, JSON
+serialization and everything else. Only the newest PROFILE_MAX_FILES
+profiles are kept.
+
+    PROFILE_CALLBACKS=1 gunicorn index:server
+    curl -H 'X-Profile-Callback: 1' ...
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+
+from flask import g, request
+
+PROFILE_HEADER = 'X-Profile-Callback'
+
+# where the time of a profiled request went, matched against the file and name of each function
+# (C functions have no file, only a name like "<method 'encode' of '_json.Encoder' objects>").
+# Checked in order, first match wins; anything else is counted as 'other'.
+# Dash serializes callback output with plotly's PlotlyJSONEncoder (in _plotly_utils/utils.py) or
+# plotly.io's JSON helpers, so those count as json rather than as plotly figure building
+CATEGORIES = [
+    ('json', re.compile(r'[\\/](json|simplejson)[\\/]|_json\b'
+                        r'|_plotly_utils[\\/]utils\.py:(encode|default|coerce_to_strict|encode_as_\w+|iterencode)$'
+                        r'|plotly[\\/]io[\\/]_json\.py:')),
+    ('pandas', re.compile(r'\bpandas[\\/.]')),
+    ('plotly', re.compile(r'\b(plotly|_plotly_utils)[\\/.]')),
+    ('numpy/scipy', re.compile(r'\b(numpy|scipy)[\\/.]'))
+]
+
+_lock = threading.Lock()
+
+
+def init_app(server):
+    server.config.setdefault('PROFILE_CALLBACKS', os.environ.get('PROFILE_CALLBACKS', '0') == '1')
+    server.config.setdefault('PROFILE_DIR', os.environ.get('PROFILE_DIR', 'profiles'))
+    server.config.setdefault('PROFILE_MAX_FILES', int(os.environ.get('PROFILE_MAX_FILES', '50')))
+
+    @server.before_request
+    def start_profile():
+        if not server.config['PROFILE_CALLBACKS']:
+            return
+        if not request.path.endswith('_dash-update-component'):
+            return
+        if request.headers.get(PROFILE_HEADER) != '1':
+            return
+
+        # cProfile can only have one active profiler per thread, which is all a request needs
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    # If the request fails before after_request runs, at least stop profiling the thread
+    @server.teardown_request
+    def discard_profile(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+    @server.after_request
+    def stop_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+
+        profiler.disable()
+        try:
+            write_profile(profiler, request.get_json(silent=True) or {},
+                          server.config['PROFILE_DIR'], server.config['PROFILE_MAX_FILES'])
+        except OSError as e:
+            server.logger.warning('could not write callback profile: %s', e)
+
+        return response
+
+
+def profile_name(body):
+    # e.g. 1603051234567-indicator-bar1.figure-F_AGECAT-PAST_W42
+    values = [str(i.get('value')) for i in body.get('inputs', []) if isinstance(i, dict)]
+    parts = [str(body.get('output', 'unknown'))] + values
+    name = '-'.join(re.sub(r'[^A-Za-z0-9_.]+', '_', p) for p in parts)[:150]
+
+    return '{}-{}'.format(int(time.time() * 1000), name)
+
+
+def summarize(stats):
+    # stats.stats maps (file, line, func) -> (cc, nc, tottime, cumtime, callers).
+    # Summing tottime (time spent in the function itself) avoids double counting nested calls
+    totals = dict.fromkeys([c for c, _ in CATEGORIES] + ['other'], 0.0)
+
+    for (fname, _, func), (_, _, tottime, _, _) in stats.stats.items():
+        for category, pattern in CATEGORIES:
+            if pattern.search(fname + ':' + func):
+                totals[category] += tottime
+                break
+        else:
+            totals['other'] += tottime
+
+    total = sum(totals.values()) or 1.0
+    lines = ['{:<12}{:>10.1f} ms{:>8.1f} %'.format(k, v * 1000, 100 * v / total) for k, v in totals.items()]
+
+    return '\n'.join(lines)
+
+
+def write_profile(profiler, body, directory, max_files):
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, profile_name(body))
+
+    profiler.dump_stats(base + '.prof')
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    out.write('time by library (self time)\n')
+    out.write(summarize(stats) + '\n\n')
+    stats.sort_stats('cumulative').print_stats(40)
+
+    with open(base + '.txt', 'w') as f:
+        f.write(out.getvalue())
+
+    prune(directory, max_files)
+
+
+def prune(directory, max_files):
+    # Keep only the newest max_files profiles. The lock keeps threads of the same worker from
+    # deleting under each other; across workers a file may already be gone, which is fine
+    with _lock:
+        profiles = sorted(f[:-5] for f in os.listdir(directory) if f.endswith('.prof'))
+
+        for name in profiles[:max(0, len(profiles) - max_files)]:
+            for ext in ('.prof', '.txt'):
+                try:
+                    os.remove(os.path.join(directory, name + ext))
+                except FileNotFoundError:
+                    pass
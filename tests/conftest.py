@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+# The tests import the app's own modules and read the W42 file through its relative path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+# By default the comparisons run on a sample that covers every demographic and every item once.
+# `pytest --all-pairs` also runs them on every (demographic, item) and (demographic, theme) pair,
+# which takes several minutes
+def pytest_addoption(parser):
+    parser.addoption('--all-pairs', action='store_true', help='compare every demographic with every item')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'all_pairs: runs on every pair; needs --all-pairs')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--all-pairs'):
+        return
+
+    skip = pytest.mark.skip(reason='runs with --all-pairs')
+    for item in items:
+        if 'all_pairs' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope='session')
+def ds():
+    from apps import dataset, explore  # importing explore loads the data
+
+    return dataset.current()
+
+
+@pytest.fixture(scope='session')
+def demographics(ds):
+    return [d['value'] for d in ds.demo_dropdown]
+
+
+# every item that can be picked on the Explore tabs
+@pytest.fixture(scope='session')
+def items(ds):
+    items = []
+    for groups in [ds.theme_select_dropdown, ds.res_dropdown, ds.pract_dropdown]:
+        items += [i for group in groups.values() for i in group if i not in items]
+
+    return items
+
+
+def sample(xs, ys):
+    # each x with the first y, and each y with one x in turn
+    return [(x, ys[0]) for x in xs] + [(xs[k % len(xs)], y) for k, y in enumerate(ys[1:], 1)]
+
+
+@pytest.fixture(scope='session', params=['sample', pytest.param('all', marks=pytest.mark.all_pairs)])
+def pairs(request, demographics, items):
+    if request.param == 'all':
+        return [(x, y) for x in demographics for y in items]
+    return sample(demographics, items)
+
+
+@pytest.fixture(scope='session', params=['sample', pytest.param('all', marks=pytest.mark.all_pairs)])
+def theme_pairs(request, ds, demographics):
+    themes = list(ds.theme_select_dropdown)
+    if request.param == 'all':
+        return [(x, theme) for x in demographics for theme in themes]
+    return sample(demographics, themes)
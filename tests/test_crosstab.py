@@ -0,0 +1,204 @@
+"""
+Tests the numpy crosstab kernels in apps/crosstab.py against the pandas
+implementations they replaced, on the W42 data.
+
+For (demographic, item) pairs covering every demographic and every item
+reachable from the Explore tabs (all pairs with --all-pairs), the percent
+distributions (make_freq_distr), the unweighted and weighted table counts
+and the chi-squared statistics are computed both ways and compared.
+
+Where the old chi-squared code raised or returned NaN, the pairs are tested
+on their own against what the new code is meant to return there.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from apps import explore
+
+
+'''
+--------------------------------
+PANDAS VERSIONS (AS THEY WERE)
+--------------------------------
+'''
+
+def pandas_freq_distr(ds, x, y, decimals=2):
+    df_copy, meta = ds.df_copy, ds.meta
+
+    new_df = pd.crosstab(df_copy[x],
+                     df_copy[y],
+                     df_copy.WEIGHT_W42, aggfunc = sum, dropna=True,
+                     normalize='index'). \
+                     loc[meta.variable_value_labels[x].values()]. \
+                     loc[:, meta.variable_value_labels[y].values()]*100
+
+    if decimals is None:
+        return new_df
+    return new_df.applymap(lambda x: round(x, decimals))
+
+
+def pandas_unweighted_counts(ds, x, y):
+    df_copy, meta = ds.df_copy, ds.meta
+    temp_groupby = df_copy.groupby([x, y]).WEIGHT_W42.count().reset_index()
+
+    return temp_groupby.pivot(index=x, columns=y, values='WEIGHT_W42')\
+                    .loc[meta.variable_value_labels[x].values()]\
+                    .loc[:, meta.variable_value_labels[y].values()]
+
+
+def pandas_weighted_counts(ds, x, y):
+    df_copy, meta = ds.df_copy, ds.meta
+    temp_groupby = df_copy.groupby([x, y]).WEIGHT_W42.sum().reset_index()
+
+    temp_groupby.WEIGHT_W42 = temp_groupby.WEIGHT_W42.map(lambda x: round(x, 0))
+
+    return temp_groupby.pivot(index=x, columns=y, values='WEIGHT_W42')\
+                    .loc[meta.variable_value_labels[x].values()]\
+                    .loc[:, meta.variable_value_labels[y].values()]
+
+
+def pandas_chi_squared(ds, x, y):
+    df = ds.df
+    stats_df = pd.crosstab(index=df[x],
+                       columns=df[y],
+                       values=df.WEIGHT_W42,
+                       aggfunc='sum',
+                       dropna=True)
+
+    stats_df = stats_df.drop(99.0, axis=0)
+    stats_df = stats_df.drop(99.0, axis=1)
+
+    return stats.chi2_contingency(stats_df.to_numpy())[:3]
+
+
+'''
+-----------------------------------------
+INTENDED RESULT WHERE THE OLD CODE FAILED
+-----------------------------------------
+'''
+# 99.0 (refused) is left out where it occurs, and a combination nobody answered counts as 0
+def intended_chi_squared(ds, x, y):
+    df = ds.df
+    stats_df = pd.crosstab(index=df[x], columns=df[y], values=df.WEIGHT_W42, aggfunc='sum', dropna=True)
+
+    stats_df = stats_df.drop(99.0, axis=0, errors='ignore')
+    stats_df = stats_df.drop(99.0, axis=1, errors='ignore')
+
+    return stats.chi2_contingency(stats_df.fillna(0).to_numpy())[:3]
+
+
+'''
+-----------
+COMPARISONS
+-----------
+'''
+
+def same_frame(new, old, decimals=None, unrounded=None):
+    # Labels and order have to match exactly. Values have to match up to floating point summation
+    # order; after rounding, a last-digit difference is only accepted where the unrounded value sits
+    # on a rounding boundary
+    if list(new.index) != list(old.index) or list(new.columns) != list(old.columns):
+        return False
+
+    a = new.to_numpy(dtype=float)
+    b = old.to_numpy(dtype=float)
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return False
+
+    diff = np.abs(np.nan_to_num(a) - np.nan_to_num(b))
+    if decimals is None:
+        return np.allclose(np.nan_to_num(a), np.nan_to_num(b), rtol=1e-9, atol=1e-9)
+
+    scaled = np.nan_to_num(unrounded.to_numpy(dtype=float)) * 10 ** decimals
+    on_boundary = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    step = 10.0 ** -decimals
+
+    return bool(np.all((diff < 1e-9) | (on_boundary & (diff <= step + 1e-9))))
+
+
+def chi_values(message):
+    # 'chi-squared: {} || p-value: {} || degrees of freedom: {}'
+    return [float(part.split(': ')[1]) for part in message.split(' || ')]
+
+
+# Items without value labels have no answer categories, so the dropdowns don't offer them
+def test_items_have_value_labels(ds, items):
+    assert 'KNOW_INDEX_W42' in ds.df.columns
+    assert [i for i in items if i not in ds.meta_vvl] == []
+
+
+def test_freq_distr(ds, pairs):
+    differ = []
+    for x, y in pairs:
+        unrounded = pandas_freq_distr(ds, x, y, None)
+        old = unrounded.applymap(lambda x: round(x, 2))
+        if not same_frame(explore.freq_distr(ds, x, y), old, 2, unrounded):
+            differ.append((x, y))
+
+    assert differ == []
+
+
+def test_unweighted_counts(ds, pairs):
+    differ = [(x, y) for x, y in pairs
+              if not same_frame(explore.unweighted_counts(ds, x, y), pandas_unweighted_counts(ds, x, y))]
+
+    assert differ == []
+
+
+def test_weighted_counts(ds, pairs):
+    differ = []
+    for x, y in pairs:
+        unrounded = explore.labelled(ds, explore.xy_counts(ds, x, y, ds.df.WEIGHT_W42.to_numpy()), x, y)
+        if not same_frame(explore.weighted_counts(ds, x, y), pandas_weighted_counts(ds, x, y), 0, unrounded):
+            differ.append((x, y))
+
+    assert differ == []
+
+
+# The old version of chi_squared raised where
+# 99.0 isn't in the table, because an item has no such code (e.g. the KNOW*_CORRECT scores) or only
+# respondents who skipped the other item gave it, and gave NaN statistics where a combination
+# of codes has no respondents; those pairs are checked against intended_chi_squared instead
+@pytest.fixture(scope='module')
+def chi_squared_pairs(ds, pairs):
+    found = {'matched': [], 'no 99.0 code': [], 'empty cell': []}
+
+    for x, y in pairs:
+        try:
+            old = pandas_chi_squared(ds, x, y)
+        except KeyError:
+            answered = ds.df[[x, y]].dropna()
+            assert 99.0 not in answered[x].values or 99.0 not in answered[y].values, (x, y)
+            found['no 99.0 code'].append((x, y))
+            continue
+
+        if np.isnan(old[0]):
+            found['empty cell'].append((x, y))
+        else:
+            found['matched'].append((x, y, old))
+
+    return found
+
+
+def test_chi_squared(ds, chi_squared_pairs):
+    differ = [(x, y) for x, y, old in chi_squared_pairs['matched']
+              if not np.allclose(chi_values(explore.chi_squared(ds, x, y)), old, rtol=1e-9)]
+
+    assert differ == []
+
+
+@pytest.mark.parametrize('reason', ['no 99.0 code', 'empty cell'])
+def test_chi_squared_where_pandas_failed(ds, chi_squared_pairs, reason):
+    # the sample has to contain such pairs for this to test anything
+    assert chi_squared_pairs[reason]
+
+    differ = []
+    for x, y in chi_squared_pairs[reason]:
+        new = chi_values(explore.chi_squared(ds, x, y))
+        if np.isnan(new[0]) or not np.allclose(new, intended_chi_squared(ds, x, y), rtol=1e-9):
+            differ.append((x, y))
+
+    assert differ == []
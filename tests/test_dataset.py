@@ -0,0 +1,24 @@
+import os
+
+from apps import dataset
+
+
+def test_latest_file_goes_by_name_not_file_times(tmp_path):
+    for name in ['ATP W42 v10.sav', 'ATP W42.sav', 'ATP W42 v2.sav', 'ATP W42 v9.sav']:
+        (tmp_path / name).write_bytes(b'')
+
+    # an older release touched later (chmod, checkout order, cp -p) doesn't take over
+    os.utime(tmp_path / 'ATP W42 v10.sav', (0, 0))
+    os.chmod(tmp_path / 'ATP W42.sav', 0o600)
+
+    assert dataset.latest_file(str(tmp_path / 'ATP W42*.sav')) == str(tmp_path / 'ATP W42 v10.sav')
+
+
+def test_file_version_changes_when_the_file_is_replaced(tmp_path):
+    fpath = tmp_path / 'ATP W42.sav'
+    fpath.write_bytes(b'old')
+    version = dataset.file_version(str(fpath))
+
+    fpath.write_bytes(b'new release')
+
+    assert dataset.file_version(str(fpath)) != version
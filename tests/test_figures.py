@@ -0,0 +1,176 @@
+"""
+Tests that the figure dicts built by apps/figures.py match the figures
+plotly.express / make_subplots produced for the same data.
+
+Both versions are serialized to JSON the way Dash sends them to the browser
+and compared key by key. Floats are compared with a small tolerance, since
+subplot domains are computed slightly differently. The charts are compared
+for a sample covering every demographic, Explore item and theme (all pairs
+with --all-pairs).
+"""
+
+import json
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from plotly.utils import PlotlyJSONEncoder
+
+from apps import crosstab, explore, figures
+
+
+'''
+--------------------------------
+PLOTLY VERSIONS (AS THEY WERE)
+--------------------------------
+'''
+
+def plotly_freq_distr(new_df):
+    fig = px.bar(data_frame=new_df,
+                 x=new_df.columns,
+                 y=new_df.index,
+                 color_discrete_sequence=['#636efa', '#00cc96', '#ef553b', '#ab63fa'])
+
+    fig.update_layout(
+        font={'size':15},
+        margin=dict(l=20, r=20, t=20, b=20),
+        xaxis_title="%",
+        yaxis_title=None,
+
+        legend=dict(
+            font=dict(size=16),
+            title=None,
+            yanchor="top",
+            y=1.5,
+            xanchor="left",
+            x=0.01)
+    )
+
+    return fig
+
+
+def plotly_theme_distr(percents, x_labels, items_labels, titles, colors):
+    n = len(items_labels)
+    fig = make_subplots(rows=n, cols=1,
+                        shared_xaxes=True,
+                        vertical_spacing=0.3 / n,
+                        subplot_titles=titles)
+
+    shown = set()
+    for j, labels in enumerate(items_labels):
+        for k, label in enumerate(labels):
+            fig.add_trace(go.Bar(x=percents[j, :, k],
+                                 y=list(x_labels),
+                                 name=label,
+                                 legendgroup=label,
+                                 showlegend=label not in shown,
+                                 orientation='h',
+                                 marker_color=colors[label]),
+                          row=j + 1, col=1)
+            shown.add(label)
+
+    fig.update_layout(
+        barmode='relative',
+        height=150 + n * (40 + 25 * len(x_labels)),
+        font={'size':15},
+        margin=dict(l=20, r=20, t=60, b=20),
+
+        legend=dict(
+            font=dict(size=16),
+            title=None,
+            orientation='h',
+            yanchor="bottom",
+            y=1.0,
+            xanchor="left",
+            x=0.01)
+    )
+    fig.update_xaxes(title_text='%', row=n, col=1)
+    fig.update_annotations(font_size=14)
+
+    return fig
+
+
+'''
+----------
+COMPARISON
+----------
+'''
+
+def as_json(fig):
+    # what Dash sends for a figure output
+    return json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
+
+
+def differences(new, old, path=''):
+    if isinstance(new, dict) and isinstance(old, dict):
+        diffs = []
+        for key in sorted(set(new) | set(old)):
+            # an empty object (e.g. the title={} left by title=None) draws the same as a missing one
+            if new.get(key, {}) == {} and old.get(key, {}) == {}:
+                continue
+            if key not in new or key not in old:
+                diffs.append('{}/{}: only in {}'.format(path, key, 'new' if key in new else 'old'))
+            else:
+                diffs += differences(new[key], old[key], '{}/{}'.format(path, key))
+        return diffs
+
+    if isinstance(new, list) and isinstance(old, list):
+        if len(new) != len(old):
+            return ['{}: length {} != {}'.format(path, len(new), len(old))]
+        return [d for i, (a, b) in enumerate(zip(new, old)) for d in differences(a, b, '{}/{}'.format(path, i))]
+
+    if isinstance(new, float) or isinstance(old, float):
+        if isinstance(new, (int, float)) and isinstance(old, (int, float)) and abs(new - old) <= 1e-9:
+            return []
+
+    if new != old:
+        return ['{}: {!r} != {!r}'.format(path, new, old)]
+    return []
+
+
+def test_freq_distr_figures(ds, pairs):
+    differ = {}
+    for x, y in pairs:
+        old = plotly_freq_distr(explore.freq_distr(ds, x, y))
+        diffs = differences(as_json(explore.make_freq_distr(ds, x, y)), as_json(old))
+        if diffs:
+            differ[x, y] = diffs[:10]
+
+    assert differ == {}
+
+
+def test_theme_distr_figures(ds, theme_pairs):
+    differ = {}
+    for x, theme in theme_pairs:
+        items = ds.theme_select_dropdown[theme]
+        x_labels = ds.meta_vvl[x]
+        y_labels = [list(ds.meta_vvl[i].values()) for i in items]
+        n_y = max(len(labels) for labels in y_labels)
+
+        counts = np.stack([np.pad(explore.xy_counts(ds, x, i, ds.df.WEIGHT_W42.to_numpy()),
+                                  ((0, 0), (0, n_y - len(ds.meta_vvl[i]))))
+                           for i in items])
+        percents = np.round(crosstab.row_percent(counts), 2)
+
+        old = plotly_theme_distr(percents,
+                                 x_labels.values(),
+                                 y_labels,
+                                 [ds.meta.column_names_to_labels[i] for i in items],
+                                 figures.label_colors(y_labels))
+        diffs = differences(as_json(explore.make_theme_distr(ds, x, theme)), as_json(old))
+        if diffs:
+            differ[x, theme] = diffs[:10]
+
+    assert differ == {}
+
+
+# A label keeps one color across the items of a theme, so each legend entry stands for one color,
+# and different labels get different colors while there are colors left
+def test_theme_colors_follow_labels(ds, demographics):
+    for theme in ds.theme_select_dropdown:
+        colors = {}
+        for trace in explore.make_theme_distr(ds, demographics[0], theme)['data']:
+            assert colors.setdefault(trace['name'], trace['marker']['color']) == trace['marker']['color']
+
+        assert len(set(colors.values())) == min(len(colors), len(figures.THEME_COLORS))
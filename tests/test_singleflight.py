@@ -0,0 +1,86 @@
+import threading
+import time
+import traceback
+
+from apps.singleflight import SingleFlight
+
+
+CALLERS = 8
+
+
+def call_together(flight, fn, release):
+    # Starts CALLERS threads calling fn(1) through flight.coalesce. fn blocks on `release`, which is
+    # set once every other caller is waiting on the first one, so all calls overlap
+    wrapped = flight.coalesce(fn)
+    outcomes = [None] * CALLERS
+
+    def caller(k):
+        try:
+            outcomes[k] = ('result', wrapped(1))
+        except Exception as e:
+            outcomes[k] = ('error', e)
+
+    threads = [threading.Thread(target=caller, args=(k,)) for k in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+
+    deadline = time.time() + 10
+    while flight.metrics()['coalesced'] < CALLERS - 1 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+
+    for thread in threads:
+        thread.join(10)
+
+    return outcomes
+
+
+def test_concurrent_calls_run_once_and_share_the_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def slow(x):
+        runs.append(x)
+        release.wait(10)
+        return {'x': x}
+
+    outcomes = call_together(flight, slow, release)
+
+    assert runs == [1]
+    assert all(kind == 'result' for kind, result in outcomes)
+    assert all(result is outcomes[0][1] for kind, result in outcomes)
+
+    metrics = flight.metrics()
+    assert metrics['functions'] == {'slow': {'calls': CALLERS, 'executed': 1, 'coalesced': CALLERS - 1}}
+    assert (metrics['calls'], metrics['executed'], metrics['coalesced']) == (CALLERS, 1, CALLERS - 1)
+    assert metrics['in_flight'] == 0
+
+
+def test_calls_after_the_first_finished_run_again():
+    flight = SingleFlight()
+    double = flight.coalesce(lambda x: 2 * x)
+
+    assert [double(1), double(1), double(2)] == [2, 2, 4]
+    assert flight.metrics()['executed'] == 3
+
+
+def test_each_caller_raises_its_own_copy_of_the_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing(x):
+        release.wait(10)
+        raise ValueError('no data for', x)
+
+    outcomes = call_together(flight, failing, release)
+    errors = [error for kind, error in outcomes]
+
+    assert all(kind == 'error' for kind, error in outcomes)
+    assert len(set(map(id, errors))) == CALLERS
+    assert all(type(e) is ValueError and e.args == ('no data for', 1) for e in errors)
+
+    # every traceback still ends in the function that failed, and none picked up another caller's frames
+    frames = [traceback.extract_tb(e.__traceback__) for e in errors]
+    assert all(tb[-1].name == 'failing' for tb in frames)
+    assert len(set(len(tb) for tb in frames)) == 1
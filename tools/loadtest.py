@@ -0,0 +1,357 @@
+"""
+Load-testing harness for the dashboard.
+
+Replays /_dash-update-component requests against a running server (or one
+started locally with gunicorn) and reports throughput, latency percentiles
+and error rates per callback. Unlike timing the functions in apps/explore.py
+directly, this goes through Flask, Dash's callback dispatch, JSON
+serialization and gunicorn's workers.
+
+Examples (run from the repository root):
+
+    # start `gunicorn index:server` with 4 workers and hit it with 16 clients
+    python tools/loadtest.py --start --workers 4 --concurrency 16 --duration 30
+
+    # replay against an already running server
+    python tools/loadtest.py --url http://127.0.0.1:8050 --requests 2000
+
+    # write the synthesized payloads out, or replay a recorded set instead
+    python tools/loadtest.py --save payloads.jsonl
+    python tools/loadtest.py --start --payloads payloads.jsonl
+
+Synthesized payloads are built from the dropdowns of the local copy of the
+data (DATASET_PATH under the repository, or --dataset). When testing a remote
+server, point --dataset at the release that server has, or replay recorded
+payloads with --payloads.
+
+A payload file has one JSON object per line: {"callback": <name>, "body": <request body>}.
+Bodies copied from the browser's network tab (the POST to
+/_dash-update-component) can be pasted in as-is.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+UPDATE_PATH = '/_dash-update-component'
+
+# rows per page of the tables, as apps.explore.PAGE_SIZE
+PAGE_SIZE = 15
+
+
+'''
+--------
+PAYLOADS
+--------
+'''
+
+def dash_body(outputs, inputs, changed):
+    # Request body in the format the Dash 1.x renderer posts to /_dash-update-component.
+    # outputs / inputs are lists of (component id, property, value) tuples
+    output_ids = ['{}.{}'.format(i, p) for i, p in outputs]
+
+    return {
+        'output': output_ids[0] if len(output_ids) == 1 else '..{}..'.format('...'.join(output_ids)),
+        'outputs': ({'id': outputs[0][0], 'property': outputs[0][1]} if len(outputs) == 1
+                    else [{'id': i, 'property': p} for i, p in outputs]),
+        'inputs': [{'id': i, 'property': p, 'value': v} for i, p, v in inputs],
+        'changedPropIds': ['{}.{}'.format(i, p) for i, p, v in inputs if i in changed],
+        'state': []
+    }
+
+
+def synthesize_payloads(fpath=None):
+    # Build one request per callback and input combination a user can reach in the UI, from the
+    # demographics and items of the survey file. Only apps.dataset is imported, so the app itself
+    # (its callbacks and precomputed tables) isn't loaded into the load generator
+    from apps import dataset
+
+    ds = dataset.Dataset(fpath or dataset.latest_file(os.path.join(ROOT, dataset.DATASET_PATH)))
+    demographics = [d['value'] for d in ds.demo_dropdown]
+    payloads = []
+
+    for pathname in ['/home', '/explore', '/data']:
+        payloads.append(('navigation', dash_body(
+            [('page-content', 'children')],
+            [('url', 'pathname', pathname)],
+            ['url'])))
+
+    for tab in ['tab-1', 'tab-2', 'tab-3', 'tab-4']:
+        payloads.append(('switch_tab', dash_body(
+            [('content', 'children')],
+            [('tabs', 'active_tab', tab)],
+            ['tabs'])))
+
+    for n, dropdown, groups in [('1', 'theme-selection', ds.theme_select_dropdown),
+                                ('2', 'researcher-selection', ds.res_dropdown),
+                                ('3', 'practitioner-selection', ds.pract_dropdown)]:
+        for group in groups:
+            payloads.append(('set_theme_options' + ('' if n == '1' else n), dash_body(
+                [('yaxis-column' + n, 'options')],
+                [(dropdown, 'value', group)],
+                [dropdown])))
+
+    tab1_items = [i for items in ds.theme_select_dropdown.values() for i in items]
+    xy = lambda x, y: [('xaxis-column1', 'value', x), ('yaxis-column1', 'value', y)]
+
+    for x in demographics:
+        for y in tab1_items:
+            payloads.append(('update_graph', dash_body(
+                [('indicator-bar1', 'figure')], xy(x, y), ['yaxis-column1'])))
+
+            payloads.append(('update_chi_squared', dash_body(
+                [('chi-squared1', 'children')], xy(x, y), ['yaxis-column1'])))
+
+            # the tables are paged on the server, so each request carries the table's paging/sorting state
+            for name, table in [('update_uw_table', 'unweighted-table1'), ('update_w_table', 'weighted-table1')]:
+                payloads.append((name, dash_body(
+                    [(table, 'columns'), (table, 'data'), (table, 'page_count')],
+                    xy(x, y) + [(table, 'page_current', 0),
+                                (table, 'page_size', PAGE_SIZE),
+                                (table, 'sort_by', [])],
+                    ['yaxis-column1'])))
+
+    for n, groups in [('2', ds.res_dropdown), ('3', ds.pract_dropdown)]:
+        for x in demographics:
+            for y in [i for items in groups.values() for i in items]:
+                payloads.append(('update_graph' + n, dash_body(
+                    [('indicator-bar' + n, 'figure')],
+                    [('xaxis-column' + n, 'value', x), ('yaxis-column' + n, 'value', y)],
+                    ['yaxis-column' + n])))
+
+    for x in demographics:
+        for theme in ds.theme_select_dropdown:
+            payloads.append(('update_theme_graph', dash_body(
+                [('theme-bar4', 'figure')],
+                [('xaxis-column4', 'value', x), ('theme-selection4', 'value', theme)],
+                ['theme-selection4'])))
+
+    return payloads
+
+
+def load_payloads(fpath):
+    with open(fpath) as f:
+        return [(p['callback'], p['body']) for p in (json.loads(line) for line in f if line.strip())]
+
+
+def save_payloads(payloads, fpath):
+    with open(fpath, 'w') as f:
+        for name, body in payloads:
+            f.write(json.dumps({'callback': name, 'body': body}) + '\n')
+
+
+'''
+------
+SERVER
+------
+'''
+
+def start_server(host, port, workers, threads, worker_class):
+    cmd = ['gunicorn', 'index:server',
+           '--bind', '{}:{}'.format(host, port),
+           '--workers', str(workers),
+           '--threads', str(threads),
+           '--worker-class', worker_class,
+           '--timeout', '120']
+
+    proc = subprocess.Popen(cmd, cwd=ROOT)
+    url = 'http://{}:{}'.format(host, port)
+
+    # Workers load the dataset on import, so give them a while before the first request
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('gunicorn exited with code {}'.format(proc.returncode))
+        try:
+            urllib.request.urlopen(url + '/_dash-layout', timeout=5).read()
+            return proc, url
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.5)
+
+    proc.terminate()
+    raise RuntimeError('server at {} did not come up'.format(url))
+
+
+'''
+------
+RUNNER
+------
+'''
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def add(self, name, latency, ok):
+        with self.lock:
+            self.latencies.setdefault(name, []).append(latency)
+            self.errors[name] = self.errors.get(name, 0) + (0 if ok else 1)
+
+
+def post(url, body, timeout):
+    data = json.dumps(body).encode('utf-8')
+    req = urllib.request.Request(url + UPDATE_PATH, data=data,
+                                 headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            # Dash answers 204 when a callback raises PreventUpdate, which still counts as a success
+            ok = resp.status in (200, 204)
+    except (urllib.error.URLError, ConnectionError, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run(url, payloads, concurrency, n_requests, duration, timeout, seed, mix):
+    results = Results()
+    rng = random.Random(seed)
+
+    # With mix='callback' every callback gets the same share of the requests, whatever the number of
+    # input combinations it has (navigation has 3, the tab 1 charts thousands). With mix='payload'
+    # every payload is equally likely, so callbacks are hit in proportion to their combinations
+    by_callback = {}
+    for name, body in payloads:
+        by_callback.setdefault(name, []).append((name, body))
+    callbacks = sorted(by_callback)
+    lock = threading.Lock()
+    sent = [0]
+    deadline = time.time() + duration if duration else None
+
+    def next_payload():
+        with lock:
+            if n_requests and sent[0] >= n_requests:
+                return None
+            if deadline and time.time() >= deadline:
+                return None
+            sent[0] += 1
+            if mix == 'payload':
+                return rng.choice(payloads)
+            return rng.choice(by_callback[rng.choice(callbacks)])
+
+    def client():
+        while True:
+            payload = next_payload()
+            if payload is None:
+                return
+            name, body = payload
+            latency, ok = post(url, body, timeout)
+            results.add(name, latency, ok)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    k = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def report(results, elapsed):
+    header = '{:<22}{:>8}{:>9}{:>10}{:>10}{:>10}{:>10}'.format(
+        'callback', 'count', 'err %', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms')
+    print(header)
+    print('-' * len(header))
+
+    rows = sorted(results.latencies.items())
+    all_latencies = []
+
+    for name, latencies in rows:
+        all_latencies.extend(latencies)
+        print(format_row(name, sorted(latencies), results.errors[name], elapsed))
+
+    print('-' * len(header))
+    print(format_row('total', sorted(all_latencies), sum(results.errors.values()), elapsed))
+
+
+def format_row(name, latencies, errors, elapsed):
+    count = len(latencies)
+    return '{:<22}{:>8}{:>9.2f}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}'.format(
+        name, count,
+        100 * errors / count if count else 0,
+        count / elapsed if elapsed else 0,
+        percentile(latencies, 50) * 1000,
+        percentile(latencies, 95) * 1000,
+        percentile(latencies, 99) * 1000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay Dash callback traffic against the dashboard.')
+    parser.add_argument('--url', default='http://127.0.0.1:8050', help='server to test (ignored with --start)')
+    parser.add_argument('--start', action='store_true', help='start gunicorn index:server locally for the run')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (with --start)')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker (with --start)')
+    parser.add_argument('--worker-class', default='sync', help='gunicorn worker class (with --start)')
+    parser.add_argument('--concurrency', type=int, default=8, help='number of concurrent clients')
+    parser.add_argument('--requests', type=int, default=0, help='stop after this many requests')
+    parser.add_argument('--duration', type=float, default=0, help='stop after this many seconds')
+    parser.add_argument('--timeout', type=float, default=60, help='per-request timeout in seconds')
+    parser.add_argument('--callbacks', help='comma separated callback names to include')
+    parser.add_argument('--payloads', help='replay payloads from a JSONL file instead of synthesizing them')
+    parser.add_argument('--dataset', help='survey file to synthesize the payloads from; should be the release '
+                                          'the tested server has (default: the local DATASET_PATH)')
+    parser.add_argument('--save', help='write the payloads to a JSONL file and exit')
+    parser.add_argument('--mix', choices=['callback', 'payload'], default='callback',
+                        help='pick a callback uniformly, then one of its payloads (default), '
+                             'or pick uniformly among all payloads')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    payloads = load_payloads(args.payloads) if args.payloads else synthesize_payloads(args.dataset)
+
+    if args.callbacks:
+        keep = set(args.callbacks.split(','))
+        payloads = [p for p in payloads if p[0] in keep]
+
+    if not payloads:
+        parser.error('no payloads to send')
+
+    if args.save:
+        save_payloads(payloads, args.save)
+        print('wrote {} payloads to {}'.format(len(payloads), args.save))
+        return
+
+    if not args.requests and not args.duration:
+        args.requests = 1000
+
+    proc = None
+    url = args.url.rstrip('/')
+    if args.start:
+        proc, url = start_server('127.0.0.1', args.port, args.workers, args.threads, args.worker_class)
+
+    try:
+        results, elapsed = run(url, payloads, args.concurrency, args.requests,
+                               args.duration, args.timeout, args.seed, args.mix)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print('{} requests in {:.1f}s against {} ({} concurrent clients)\n'.format(
+        sum(len(v) for v in results.latencies.values()), elapsed, url, args.concurrency))
+    report(results, elapsed)
+
+
+if __name__ == '__main__':
+    main()